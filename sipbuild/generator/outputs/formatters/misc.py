@@ -3,6 +3,9 @@
 # Copyright (c) 2024 Phil Thompson <phil@riverbankcomputing.com>
 
 
+from ...specification import MappedType
+
+
 def fmt_copying(copying, comment):
     """ Return a formatted %Copying text. """
 
@@ -17,7 +20,12 @@ def fmt_copying(copying, comment):
 def fmt_scoped_py_name(scope, py_name):
     """ Return a formatted scoped Python name. """
 
-    if scope is None or scope.is_hidden_namespace:
+    if scope is None:
+        scope_s = ''
+    elif isinstance(scope, MappedType):
+        # Mapped types cannot be nested.
+        scope_s = scope.py_name.name + '.'
+    elif scope.is_hidden_namespace:
         scope_s = ''
     else:
         scope_s = fmt_scoped_py_name(scope.scope, None) + scope.py_name.name + '.'
@@ -32,7 +40,8 @@ def fmt_scoped_py_name(scope, py_name):
 
 def iface_is_defined(iface_file, scope, module, defined):
     """ Return True if a type corresponding to an interface file has been
-    defined in the context of a module.
+    defined in the context of a module.  defined is the set of the ids of the
+    interface files that have been defined so far.
     """
 
     # It is implicitly defined if we are not keeping a record.
@@ -43,12 +52,12 @@ def iface_is_defined(iface_file, scope, module, defined):
     if iface_file.module is not module:
         return True
 
-    if iface_file not in defined:
+    if id(iface_file) not in defined:
         return False
 
     # Check all enclosing scopes have been defined as well.
     while scope is not None:
-        if scope.iface_file not in defined:
+        if id(scope.iface_file) not in defined:
             return False
 
         scope = scope.scope
@@ -8,42 +8,91 @@ from ...version import SIP_VERSION_STR
 from ..python_slots import is_number_slot, reflected_slot
 from ..specification import (AccessSpecifier, ArgumentType, ArrayArgument,
         EnumBaseType, IfaceFileType, PyQtMethodSpecifier, PySlot, Signature)
-from ..utils import append_iface_file, find_method
 
 from .formatters import (fmt_argument_as_type_hint, fmt_class_as_type_hint,
         fmt_copying, fmt_scoped_py_name, fmt_signature_as_type_hint)
 
 
+# The Python enum type corresponding to each enum base type.
+_ENUM_SUPERCLASSES = {
+    EnumBaseType.ENUM: 'enum.Enum',
+    EnumBaseType.FLAG: 'enum.Flag',
+    EnumBaseType.INT_ENUM: 'enum.IntEnum',
+    EnumBaseType.UINT_ENUM: 'enum.IntEnum',
+    EnumBaseType.INT_FLAG: 'enum.IntFlag',
+}
+
+# The pre-computed indentation strings for the most common depths.
+_INDENTS = tuple([' ' * (4 * indent) for indent in range(32)])
+
+
 def output_pyi(spec, project, pyi_filename):
     """ Output a .pyi file. """
 
-    with open(pyi_filename, 'w', encoding='UTF-8') as pf:
-        # Write the header.
-        version_info_s = f'#\n# Generated by SIP {SIP_VERSION_STR}\n' if project.version_info else ''
+    ctx = _Context(spec)
+    pf = ctx.pf
 
-        copying_s = fmt_copying(spec.module.copying, '#')
+    # Write the header.
+    version_info_s = f'#\n# Generated by SIP {SIP_VERSION_STR}\n' if project.version_info else ''
 
-        pf.write(
+    copying_s = fmt_copying(spec.module.copying, '#')
+
+    pf.write(
 f'''# The PEP 484 type hints stub file for the {spec.module.py_name} module.
 {version_info_s}{copying_s}''')
 
-        if spec.is_composite:
-            _composite_module(pf, spec)
-        else:
-            _module(pf, spec)
+    if spec.is_composite:
+        _composite_module(ctx)
+    else:
+        _module(ctx)
+
+    # Newlines are written as they are on all platforms.
+    with open(pyi_filename, 'w', encoding='UTF-8', newline='\n') as f:
+        f.write(''.join(pf.parts))
+
+
+class _Buffer:
+    """ A write-only text buffer that accumulates the parts of a .pyi file. """
+
+    __slots__ = ('parts', )
+
+    def __init__(self):
+        """ Initialise the buffer. """
+
+        self.parts = []
+
+    def separate(self, first=True, indent=0, minimum=None):
+        """ Append a newline if not already done. """
+
+        if first:
+            self.parts.append('\n' if indent else '\n\n')
+        elif minimum is not None:
+            self.parts.append('\n' * minimum)
+
+        return False
+
+    def write(self, s):
+        """ Append a string to the buffer. """
+
+        self.parts.append(s)
 
 
-def _composite_module(pf, spec):
+def _composite_module(ctx):
     """ Output the type hints for a composite module. """
 
+    pf = ctx.pf
+    spec = ctx.spec
+
     for mod in spec.module.all_imports:
         if mod.composite is spec.module:
             pf.write(f'from {mod.fq_py_name.name} import *\n')
 
 
-def _module(pf, spec):
+def _module(ctx):
     """ Output the type hints for an ordinary module. """
 
+    pf = ctx.pf
+    spec = ctx.spec
     module = spec.module
 
     first = True
@@ -53,411 +102,363 @@ def _module(pf, spec):
     if spec.abi_version >= (13, 0):
         for enum in spec.enums:
             if enum.module is spec.module:
-                first = _separate(pf, first=first)
+                first = pf.separate(first=first)
                 pf.write('import enum\n')
                 break
 
     if spec.sip_module:
-        first = _separate(pf, first=first)
+        first = pf.separate(first=first)
         pf.write(
 f'''import typing
 
 import {spec.sip_module}
 ''')
 
-    imports = []
-
-    for mod in module.all_imports:
-        parts = mod.fq_py_name.name.split('.')
-
-        if mod.fq_py_name.name == mod.py_name:
-            imports.append('import ' + mod.py_name)
-        else:
-            scope = mod.fq_py_name.name[:-len(mod.py_name) - 1]
-            imports.append('from ' + scope + ' import ' + mod.py_name)
+    imports = list(_imports(module))
 
     if imports:
-        first = _separate(pf, first=first, minimum=1)
-        pf.write('\n'.join(imports) + '\n')
+        first = pf.separate(first=first, minimum=1)
+        pf.write(''.join(imports))
 
     # Generate any exported type hint code and any module-specific type hint
     # code.
-    first = _type_hint_code(pf, spec.exported_type_hint_code, first)
-    first = _type_hint_code(pf, module.type_hint_code, first)
+    first = _type_hint_code(ctx, spec.exported_type_hint_code, first)
+    first = _type_hint_code(ctx, module.type_hint_code, first)
 
     # Generate the types - global enums must be first.
-    _enums(pf, spec)
+    _enums(ctx)
 
-    # The list of enums and classes that have been defined at any particular
-    # point so we know if they can be referenced directly rather than by their
-    # names as a string.
-    defined = []
-
-    for klass in spec.classes:
+    # Only handle non-nested classes here.
+    for klass in ctx.classes_in(None):
         if klass.iface_file.module is not module:
             continue
 
         if klass.external:
             continue
 
-        if klass.no_type_hint:
-            continue
-
-        # Only handle non-nested classes here.
-        if klass.scope is not None:
-            continue
-
         # We can't handle extenders.
         if klass.real_class is not None:
             continue
 
-        _class(pf, spec, klass, defined)
+        _class(ctx, klass)
 
     for mapped_type in spec.mapped_types:
         if mapped_type.iface_file.module is not module:
             continue
 
         if mapped_type.py_name is not None:
-            _mapped_type(pf, spec, mapped_type, defined)
+            _mapped_type(ctx, mapped_type)
 
-    _variables(pf, spec, defined)
+    _variables(ctx)
 
     first = True
 
+    overloads = _visible_overloads(module.overloads)
+
     for member in module.global_functions:
         if member.py_slot is None:
-            first = _separate(pf, first=first)
-            _callable(pf, spec, member, module.overloads, defined)
+            first = pf.separate(first=first)
+            _callable(ctx, member, overloads)
+
+
+def _imports(module):
+    """ Generate the import statements for the modules imported by a module.
+    """
+
+    for mod in module.all_imports:
+        fq_name = mod.fq_py_name.name
+        py_name = mod.py_name
 
+        if fq_name == py_name:
+            yield f'import {py_name}\n'
+        else:
+            yield f'from {fq_name[:-len(py_name) - 1]} import {py_name}\n'
 
-def _type_hint_code(pf, type_hint_code, first=True, indent=0):
+
+def _type_hint_code(ctx, type_hint_code, first=True, indent=0):
     """ Output handwritten type hint code. """
 
-    s = ''
+    pf = ctx.pf
+    pad = _indent(indent)
+    parts = []
 
     for block in type_hint_code:
-        if s == '':
-            first = _separate(pf, first=first, indent=indent, minimum=1)
+        if not parts:
+            first = pf.separate(first=first, indent=indent, minimum=1)
         else:
-            s += '\n'
-
-        need_indent = True
+            parts.append('\n')
 
-        for ch in block.text:
-            if need_indent:
-                s += _indent(indent)
-                need_indent = False
+        if pad:
+            # Indent each line but not anything following a trailing newline.
+            lines = block.text.split('\n')
+            last = lines.pop()
 
-            s += ch
+            parts.extend([pad + line + '\n' for line in lines])
 
-            if ch == '\n':
-                need_indent = True
+            if last:
+                parts.append(pad + last)
+        elif block.text:
+            parts.append(block.text)
 
-    pf.write(s)
+    pf.write(''.join(parts))
 
     return first
 
 
-def _class(pf, spec, klass, defined, indent=0):
+def _class(ctx, klass, indent=0):
     """ Output the type hints for a class. """
 
-    nr_overloads = 0
+    pf = ctx.pf
 
-    if not klass.is_hidden_namespace:
-        _separate(pf, indent=indent)
+    # Get the ctors and overloads that have type hints.
+    ctors = [ctor for ctor in klass.ctors
+            if ctor.access_specifier is not AccessSpecifier.PRIVATE and not ctor.no_type_hint]
+    overloads = _visible_overloads(klass.overloads)
 
-        s = _indent(indent)
+    if not klass.is_hidden_namespace:
+        pf.separate(indent=indent)
 
-        s += f'class {klass.py_name.name}('
+        parts = [_indent(indent), 'class ', klass.py_name.name, '(']
 
         if klass.superclasses:
-            s += ', '.join(
-                    [fmt_class_as_type_hint(spec, sc, defined)
-                            for sc in klass.superclasses])
+            parts.append(', '.join(
+                    [fmt_class_as_type_hint(ctx.spec, sc, ctx.defined)
+                            for sc in klass.superclasses]))
 
         elif klass.supertype is not None:
-            # In ABI v12 the default supertype does not contain the fully
-            # qualified name of the sip module so we fix it here.
-            if spec.abi_version[0] == 12 and spec.sip_module and klass.supertype.name.startswith('sip.'):
-                s += spec.sip_module + klass.supertype.name[4:]
+            supertype = klass.supertype.name
+
+            if ctx.supertype_prefix is not None and supertype.startswith('sip.'):
+                parts.append(ctx.supertype_prefix)
+                parts.append(supertype[4:])
             else:
-                s += klass.supertype.name
+                parts.append(supertype)
 
         else:
             simple = 'simple' if klass.iface_file.type is IfaceFileType.NAMESPACE else ''
 
-            s += f'{_sip_module_name(spec)}{simple}wrapper'
+            parts.append(f'{ctx.sip_prefix}{simple}wrapper')
 
         # See if there is anything in the class body.
-        for ctor in klass.ctors:
-            if ctor.access_specifier is AccessSpecifier.PRIVATE:
-                continue
-
-            if ctor.no_type_hint:
-                continue
-
-            nr_overloads += 1
-
-        no_body = (klass.type_hint_code is None and nr_overloads == 0)
-
-        if no_body:
-            for overload in klass.overloads:
-                if overload.access_specifier is AccessSpecifier.PRIVATE:
-                    continue
-
-                if overload.no_type_hint:
-                    continue
-
-                no_body = False
-                break
-
-        if no_body:
-            for enum in spec.enums:
-                if enum.scope is klass and not enum.no_type_hint:
-                    no_body = False
-                    break
-
-        if no_body:
-            for nested in spec.classes:
-                if nested.scope is klass and not nested.no_type_hint:
-                    no_body = False
-                    break
-
-        if no_body:
-            for variable in spec.variables:
-                if variable.scope is klass and not variable.no_type_hint:
-                    no_body = False
-                    break
+        no_body = (klass.type_hint_code is None and not ctors and not overloads
+                and not ctx.enums_in(klass)
+                and not ctx.classes_in(klass)
+                and not ctx.variables_in(klass))
 
         suffix = ' ...' if no_body else ''
 
-        s += f'):{suffix}\n'
+        parts.append(f'):{suffix}\n')
 
-        pf.write(s)
+        pf.write(''.join(parts))
 
         indent += 1
 
         if klass.type_hint_code is not None:
-            _type_hint_code(pf, [klass.type_hint_code], indent=indent)
+            _type_hint_code(ctx, [klass.type_hint_code], indent=indent)
 
-    _enums(pf, spec, defined=defined, scope=klass, indent=indent)
+    _enums(ctx, scope=klass, indent=indent)
 
     # Handle any nested classes.
-    for nested in spec.classes:
-        if nested.scope is klass and not nested.no_type_hint:
-            _class(pf, spec, nested, defined, indent=indent)
+    for nested in ctx.classes_in(klass):
+        _class(ctx, nested, indent=indent)
 
-    _variables(pf, spec, defined, scope=klass, indent=indent)
+    _variables(ctx, scope=klass, indent=indent)
 
     first = True
 
-    for ctor in klass.ctors:
-        if ctor.access_specifier is AccessSpecifier.PRIVATE:
-            continue
+    for ctor in ctors:
+        first = pf.separate(first=first, indent=indent)
 
-        if ctor.no_type_hint:
-            continue
+        _ctor(ctx, ctor, len(ctors) > 1, indent)
+
+    if klass.properties:
+        # Map the method names to the methods (giving precedence to the first
+        # of any duplicates).
+        methods = {member.py_name.name: member
+                for member in reversed(klass.members)}
+
+        # The signatures of the property getters and setters are also needed
+        # for the corresponding methods so format them once.  Nothing is
+        # defined while the methods and properties are being handled.
+        for prop in klass.properties:
+            for name in (prop.getter, prop.setter):
+                member = methods.get(name)
+                if member is None:
+                    continue
 
-        first = _separate(pf, first=first, indent=indent)
+                member_overloads = overloads.get(id(member))
+                if member_overloads:
+                    signature = member_overloads[0].py_signature
+                    type_hint = fmt_signature_as_type_hint(ctx.spec,
+                            signature, need_self=True, defined=ctx.defined)
 
-        _ctor(pf, spec, ctor, nr_overloads > 1, defined, indent)
+                    ctx.property_type_hints[id(signature)] = type_hint
 
     first = True
 
     for member in klass.members:
-        first = _separate(pf, first=first, indent=indent)
+        first = pf.separate(first=first, indent=indent)
 
-        _callable(pf, spec, member, klass.overloads, defined,
+        _callable(ctx, member, overloads,
                 is_method=not klass.is_hidden_namespace, indent=indent)
 
     for prop in klass.properties:
-        first = _separate(pf, first=first, indent=indent)
+        first = pf.separate(first=first, indent=indent)
 
-        getter = find_method(klass, prop.getter)
+        getter = methods.get(prop.getter)
         if getter is not None:
-            _property(pf, spec, prop, False, getter, klass.overloads, defined,
-                    indent)
+            _property(ctx, prop, False, getter, overloads, indent)
 
             if prop.setter is not None:
-                setter = find_method(klass, prop.setter)
+                setter = methods.get(prop.setter)
                 if setter is not None:
-                    _property(pf, spec, prop, True, setter, klass.overloads,
-                            defined, indent)
+                    _property(ctx, prop, True, setter, overloads, indent)
+
+    ctx.property_type_hints.clear()
 
     if not klass.is_hidden_namespace:
         # Keep track of what has been defined so that forward references are no
         # longer required.
-        append_iface_file(defined, klass.iface_file)
+        ctx.defined.add(id(klass.iface_file))
 
 
-def _mapped_type(pf, spec, mapped_type, defined):
+def _mapped_type(ctx, mapped_type):
     """ Output the type hints for a mapped type. """
 
-    # See if there is anything in the mapped type body.
-    no_body = (len(mapped_type.members) == 0)
+    pf = ctx.pf
 
-    if no_body:
-        for enum in spec.enums:
-            if enum.scope is mapped_type and not enum.no_type_hint:
-                no_body = FALSE
-                break
+    # See if there is anything in the mapped type body.
+    no_body = (len(mapped_type.members) == 0
+            and not ctx.enums_in(mapped_type))
 
     if not no_body:
-        _separate(pf)
-        pf.write(f'class {mapped_type.py_name.name}({_sip_module_name(spec)}wrapper):\n')
+        pf.separate()
+        pf.write(
+                f'class {mapped_type.py_name.name}({ctx.sip_prefix}wrapper):\n')
 
-        _enums(pf, spec, defined=defined, scope=mapped_type, indent=1)
+        _enums(ctx, scope=mapped_type, indent=1)
 
         first = True
 
+        overloads = _visible_overloads(mapped_type.overloads)
+
         for member in mapped_type.members:
-            first = _separate(pf, first=first, indent=1)
-            _callable(pf, spec, member, member.overloads, defined,
-                    is_method=True, indent=1)
+            first = pf.separate(first=first, indent=1)
+            _callable(ctx, member, overloads, is_method=True, indent=1)
 
     # Keep track of what has been defined so that forward references are no
     # longer required.
-    append_iface_file(defined, mapped_type.iface_file)
+    ctx.defined.add(id(mapped_type.iface_file))
 
 
-def _ctor(pf, spec, ctor, overloaded, defined, indent):
+def _ctor(ctx, ctor, overloaded, indent):
     """ Output a ctor type hint. """
 
+    pf = ctx.pf
+    pad = _indent(indent)
+
     if overloaded:
-        s = _indent(indent)
-        s += '@typing.overload\n'
-        pf.write(s)
+        pf.write(pad + '@typing.overload\n')
 
-    s = _indent(indent)
-    s += 'def __init__'
-    s += _python_signature(spec, ctor.py_signature, defined)
-    s += ': ...\n'
+    signature = ctx.signature_type_hint(ctor.py_signature)
 
-    pf.write(s)
+    pf.write(f'{pad}def __init__{signature}: ...\n')
 
 
-def _enums(pf, spec, defined=None, scope=None, indent=0):
+def _enums(ctx, scope=None, indent=0):
     """ Output the type hints for all the enums in a scope. """
 
-    for enum in spec.enums:
-        if enum.module is not spec.module:
-            continue
-
-        if enum.scope is not scope:
-            continue
-
-        if enum.no_type_hint:
-            continue
+    pf = ctx.pf
+    pad = _indent(indent)
+    member_pad = _indent(indent + 1)
+    use_enum_module = (ctx.spec.abi_version >= (13, 0))
 
-        _separate(pf, indent=indent)
+    for enum in ctx.enums_in(scope):
+        pf.separate(indent=indent)
 
         if enum.py_name is not None:
             enum_type = fmt_scoped_py_name(enum.scope, enum.py_name.name)
 
-            superclass = 'int'
-
-            if spec.abi_version >= (13, 0):
-                if enum.base_type is EnumBaseType.ENUM:
-                    superclass = 'enum.Enum'
-                elif enum.base_type is EnumBaseType.FLAG:
-                    superclass = 'enum.Flag'
-                elif enum.base_type in (EnumBaseType.INT_ENUM, EnumBaseType.UINT_ENUM):
-                    superclass = 'enum.IntEnum'
-                elif enum.base_type is EnumBaseType.INT_FLAG:
-                    superclass = 'enum.IntFlag'
+            if use_enum_module:
+                superclass = _ENUM_SUPERCLASSES.get(enum.base_type, 'int')
+            else:
+                superclass = 'int'
 
             # Handle an enum with no members.
-            for member in enum.members:
-                if not member.no_type_hint:
-                    trivial = ''
-                    break
+            if any(not member.no_type_hint for member in enum.members):
+                trivial = ''
             else:
                 trivial = ' ...'
 
-            s = _indent(indent)
-            s+= f'class {enum.py_name.name}({superclass}):{trivial}\n'
-            pf.write(s)
+            pf.write(
+                    f'{pad}class {enum.py_name.name}({superclass}):{trivial}\n')
 
-            indent += 1
+            enum_pad = member_pad
         else:
             enum_type = 'int'
+            enum_pad = pad
 
         for member in enum.members:
             if not member.no_type_hint:
-                s = _indent(indent)
-                s += f'{member.py_name.name} = ... # type: {enum_type}\n'
-                pf.write(s)
-
-        if enum.py_name is not None:
-            indent -= 1
+                pf.write(
+                        f'{enum_pad}{member.py_name.name} = ... # type: {enum_type}\n')
 
 
-def _variables(pf, spec, defined, scope=None, indent=0):
+def _variables(ctx, scope=None, indent=0):
     """ Output the type hints for all the variables in a scope. """
 
+    pf = ctx.pf
+    pad = _indent(indent)
     first = True
 
-    for variable in spec.variables:
-        if variable.module is not spec.module:
-            continue
-
-        if variable.scope is not scope:
-            continue
-
-        if variable.no_type_hint:
-            continue
-
-        py_type = fmt_argument_as_type_hint(spec, variable.type, defined,
-                arg_nr=None)
+    for variable in ctx.variables_in(scope):
+        py_type = fmt_argument_as_type_hint(ctx.spec, variable.type,
+                ctx.defined, arg_nr=None)
 
-        first = _separate(pf, first=first, indent=indent)
+        first = pf.separate(first=first, indent=indent)
 
-        s = _indent(indent)
-        s += f'{variable.py_name.name} = ... # type: {py_type}\n'
-        pf.write(s)
+        pf.write(f'{pad}{variable.py_name.name} = ... # type: {py_type}\n')
 
 
-def _callable(pf, spec, member, overloads, defined, is_method=False, indent=0):
+def _callable(ctx, member, overloads, is_method=False, indent=0):
     """ Output the type hints for a callable. """
 
-    # Get the non-reflected and reflected overloads.
+    # Get the non-reflected and reflected overloads.  Only number slots can
+    # have reflected overloads.
     nonreflected_overloads = []
     reflected_overloads = []
 
-    for overload in overloads:
-        if overload.access_specifier is AccessSpecifier.PRIVATE:
-            continue
+    add_nonreflected = nonreflected_overloads.append
 
-        if overload.common is not member:
-            continue
-
-        if overload.no_type_hint:
-            continue
+    if is_number_slot(member.py_slot):
+        add_reflected = reflected_overloads.append
+    else:
+        add_reflected = add_nonreflected
 
+    for overload in overloads.get(id(member), ()):
         # Signals can have the same name as ordinary methods however
         # 'typing.overload' cannot be used with ClassVar.  We choose to
         # generate a type hint for the signal rather than any method.
         if overload.pyqt_method_specifier is PyQtMethodSpecifier.SIGNAL:
-            scope = '' if spec.module.py_name == 'QtCore' else 'QtCore.'
+            scope = '' if ctx.spec.module.py_name == 'QtCore' else 'QtCore.'
 
-            s = _indent(indent)
-            s += f'{overload.common.py_name.name}: typing.ClassVar[{scope}pyqtSignal]\n'
-            pf.write(s)
+            ctx.pf.write(
+                    f'{_indent(indent)}{overload.common.py_name.name}: typing.ClassVar[{scope}pyqtSignal]\n')
 
             return
 
-        if is_number_slot(overload.common.py_slot) and overload.is_reflected:
-            reflected_overloads.append(overload)
+        if overload.is_reflected:
+            add_reflected(overload)
         else:
-            nonreflected_overloads.append(overload)
+            add_nonreflected(overload)
 
     # Handle each non-reflected overload.
     overloaded = len(nonreflected_overloads) > 1
     first_overload = True
 
     for overload in nonreflected_overloads:
-        _overload(pf, spec, overload, overloaded, first_overload, is_method,
-                defined, indent)
+        _overload(ctx, overload, overloaded, first_overload, is_method,
+                indent)
         first_overload = False
 
     # Handle each reflected overload.
@@ -465,64 +466,55 @@ def _callable(pf, spec, member, overloads, defined, is_method=False, indent=0):
     first_overload = True
 
     for overload in reflected_overloads:
-        _overload(pf, spec, overload, overloaded, first_overload, is_method,
-                defined, indent)
+        _overload(ctx, overload, overloaded, first_overload, is_method,
+                indent)
         first_overload = False
 
 
-def _property(pf, spec, prop, is_setter, member, overloads, defined, indent):
+def _property(ctx, prop, is_setter, member, overloads, indent):
     """ Output the type hints for a property. """
 
-    for overload in overloads:
-        if overload.access_specifier is AccessSpecifier.PRIVATE:
-            continue
-
-        if overload.common is not member:
-            continue
-
-        if overload.no_type_hint:
-            continue
-
-        s = _indent(indent)
+    pad = _indent(indent)
 
+    for overload in overloads.get(id(member), ()):
         if is_setter:
-            s += f'@{prop.name.name}.setter\n'
+            decorator = f'@{prop.name.name}.setter'
         else:
-            s += '@property\n'
-
-        pf.write(s)
+            decorator = '@property'
 
-        signature = _python_signature(spec, overload.py_signature, defined)
+        signature = ctx.signature_type_hint(overload.py_signature)
 
-        s = _indent(indent)
-        s += f'def {prop.name.name}{signature}: ...\n'
-        pf.write(s)
+        ctx.pf.write(
+                ''.join([pad, decorator, '\n', pad, 'def ', prop.name.name,
+                        signature, ': ...\n']))
 
         break
 
 
-def _overload(pf, spec, overload, overloaded, first_overload, is_method,
-        defined, indent):
+def _overload(ctx, overload, overloaded, first_overload, is_method, indent):
     """ Output the type hints for a single overload. """
 
     # mypy recommends using 'object' as the argument type.
     is_eq_slot = (overload.common.py_slot in (PySlot.EQ, PySlot.NE))
 
     # The recommendation means any subsequent overloads are pointless.
-    if is_eq_slot:
-        if not first_overload:
-            return
-    elif overloaded:
-        pf.write(_indent(indent) + '@typing.overload\n')
+    if is_eq_slot and not first_overload:
+        return
+
+    pad = _indent(indent)
+    parts = []
+
+    if overloaded and not is_eq_slot:
+        parts.append(pad)
+        parts.append('@typing.overload\n')
 
     if is_method and overload.is_static:
-        pf.write(_indent(indent) + '@staticmethod\n')
+        parts.append(pad)
+        parts.append('@staticmethod\n')
 
     py_name = overload.common.py_name.name
     py_signature = overload.py_signature
 
-    s = _indent(indent)
-
     if is_eq_slot:
         signature = '(self, other: object)'
     else:
@@ -544,36 +536,36 @@ def _overload(pf, spec, overload, overloaded, first_overload, is_method,
                 py_signature = Signature(args=[arg],
                         result=py_signature.result)
 
-        signature = _python_signature(spec, py_signature, defined,
-                need_self=need_self)
+        signature = ctx.signature_type_hint(py_signature, need_self=need_self)
 
-    s += f'def {py_name}{signature}: ...\n'
+    parts.extend([pad, 'def ', py_name, signature, ': ...\n'])
 
-    pf.write(s)
+    ctx.pf.write(''.join(parts))
 
 
-def _python_signature(spec, signature, defined, need_self=True):
-    """ Return a Python signature. """
+def _visible_overloads(overloads):
+    """ Return a dict of the lists of overloads that have type hints keyed by
+    the id() of the corresponding member.
+    """
 
-    return fmt_signature_as_type_hint(spec, signature, need_self=need_self,
-            defined=defined)
+    visible = {}
 
+    for overload in overloads:
+        if overload.access_specifier is AccessSpecifier.PRIVATE:
+            continue
 
-def _indent(indent):
-    """ Return the required indentation. """
+        if overload.no_type_hint:
+            continue
 
-    return ' ' * (4 * indent)
+        visible.setdefault(id(overload.common), []).append(overload)
 
+    return visible
 
-def _separate(pf, first=True, indent=0, minimum=None):
-    """ Output a newline if not already done. """
 
-    if first:
-        pf.write('\n' if indent else '\n\n')
-    elif minimum is not None:
-        pf.write('\n' * minimum)
+def _indent(indent):
+    """ Return the required indentation. """
 
-    return False
+    return _INDENTS[indent] if indent < len(_INDENTS) else ' ' * (4 * indent)
 
 
 def _sip_module_name(spec):
@@ -582,3 +574,84 @@ def _sip_module_name(spec):
     """
 
     return spec.sip_module + '.' if spec.sip_module else ''
+
+
+class _Context:
+    """ The context in which the type hints for a module are generated. """
+
+    __slots__ = ('pf', 'spec', 'defined', 'sip_prefix', 'supertype_prefix',
+            'property_type_hints', '_classes', '_enums', '_variables')
+
+    def __init__(self, spec):
+        """ Initialise the context. """
+
+        # The type hints are accumulated in memory and written with a single
+        # call.
+        self.pf = _Buffer()
+
+        self.spec = spec
+
+        # The set of the ids of the interface files of the classes and mapped
+        # types that have been defined at any particular point so we know if
+        # they can be referenced directly rather than by their names as a
+        # string.
+        self.defined = set()
+
+        self.sip_prefix = _sip_module_name(spec)
+
+        # In ABI v12 the default supertype does not contain the fully
+        # qualified name of the sip module so we will need to fix it.
+        if spec.abi_version[0] == 12 and spec.sip_module:
+            self.supertype_prefix = self.sip_prefix
+        else:
+            self.supertype_prefix = None
+
+        # The classes, enums and variables that have type hints indexed by the
+        # id() of the scope that contains them.
+        self._classes = {}
+        self._enums = {}
+        self._variables = {}
+
+        for klass in spec.classes:
+            if not klass.no_type_hint:
+                self._classes.setdefault(id(klass.scope), []).append(klass)
+
+        for enum in spec.enums:
+            if enum.module is spec.module and not enum.no_type_hint:
+                self._enums.setdefault(id(enum.scope), []).append(enum)
+
+        for variable in spec.variables:
+            if variable.module is spec.module and not variable.no_type_hint:
+                self._variables.setdefault(id(variable.scope), []).append(
+                        variable)
+
+        # The formatted signatures (including self) of the getters and
+        # setters of the properties of the class currently being handled,
+        # keyed by the id() of the signature.
+        self.property_type_hints = {}
+
+    def classes_in(self, scope):
+        """ Return the sequence of classes in a scope. """
+
+        return self._classes.get(id(scope), ())
+
+    def enums_in(self, scope):
+        """ Return the sequence of enums in a scope. """
+
+        return self._enums.get(id(scope), ())
+
+    def signature_type_hint(self, signature, need_self=True):
+        """ Return the type hint for a Python signature. """
+
+        if need_self:
+            type_hint = self.property_type_hints.get(id(signature))
+            if type_hint is not None:
+                return type_hint
+
+        return fmt_signature_as_type_hint(self.spec, signature,
+                need_self=need_self, defined=self.defined)
+
+    def variables_in(self, scope):
+        """ Return the sequence of variables in a scope. """
+
+        return self._variables.get(id(scope), ())
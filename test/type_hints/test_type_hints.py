@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Copyright (c) 2024 Phil Thompson <phil@riverbankcomputing.com>
+
+
+import os
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+from sipbuild.generator import parse, resolve
+from sipbuild.generator.outputs import output_pyi
+from sipbuild.version import SIP_VERSION
+
+
+class TypeHintsTestCase(unittest.TestCase):
+    """ Test the generation of type hints stub files. """
+
+    @classmethod
+    def setUpClass(cls):
+        """ Generate the type hints stub file. """
+
+        cls.pyi = _generate_pyi('type_hints', '13.8')
+
+    def test_default_supertype_v12(self):
+        """ Test that a sip module default supertype is fully qualified in ABI
+        v12.
+        """
+
+        pyi = _generate_pyi('supertype_v12', '12.15')
+
+        self.assertIn('class Klass(supertype_v12.sip.simplewrapper):', pyi)
+
+    def test_mapped_type_no_body(self):
+        """ Test that a mapped type with nothing in its body is omitted. """
+
+        self.assertNotIn('class EmptyMappedType(', self.pyi)
+
+    def test_mapped_type_enum(self):
+        """ Test that a mapped type with no members but with an enum has a
+        body.
+        """
+
+        self.assertIn(
+'''class EnumMappedType(type_hints.sip.wrapper):
+
+    class MappedEnum(enum.Enum):
+        MappedMember = ... # type: EnumMappedType.MappedEnum
+''', self.pyi)
+
+    def test_mapped_type_member(self):
+        """ Test that a mapped type with a member has a body. """
+
+        self.assertIn(
+'''class MemberMappedType(type_hints.sip.wrapper):
+
+    @staticmethod
+    def make(a: int) -> int: ...
+''', self.pyi)
+
+
+def _generate_pyi(module_name, abi_version):
+    """ Return the type hints stub file generated for a module in the test
+    directory.
+    """
+
+    test_dir = os.path.dirname(__file__)
+    sip_file = os.path.join(test_dir, module_name + '.sip')
+
+    spec, modules, _ = parse(sip_file, SIP_VERSION, 'UTF-8', abi_version, [],
+            [], True, [], module_name + '.sip')
+    resolve(spec, modules)
+
+    # The only part of the project that is used is the version information.
+    project = SimpleNamespace(version_info=False)
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        pyi_filename = os.path.join(build_dir, module_name + '.pyi')
+        output_pyi(spec, project, pyi_filename)
+
+        with open(pyi_filename, encoding='UTF-8') as f:
+            return f.read()